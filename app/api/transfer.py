@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app.database.db import get_db
 from app.schemas import transaction as transaction_schema
 from app.crud import transaction as transaction_crud
+from app.core.rate_limiter import limiter, pin_rate_limit, TRANSFER_LIMIT
 
 router = APIRouter()
 
-@router.post("/", response_model=transaction_schema.Transaction)
-def transfer_money(transaction: transaction_schema.TransactionCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=transaction_schema.Transaction, dependencies=[Depends(pin_rate_limit)])
+@limiter.limit(TRANSFER_LIMIT)
+def transfer_money(request: Request, transaction: transaction_schema.TransactionCreate, db: Session = Depends(get_db)):
     return transaction_crud.create_transfer_vulnerable(db=db, transaction=transaction)
 
-@router.post("/batch", response_model=list[transaction_schema.Transaction])
-def batch_transfer(batch: transaction_schema.BatchTransferCreate, db: Session = Depends(get_db)):
+@router.post("/batch", response_model=list[transaction_schema.Transaction], dependencies=[Depends(pin_rate_limit)])
+@limiter.limit(TRANSFER_LIMIT)
+def batch_transfer(request: Request, batch: transaction_schema.BatchTransferCreate, db: Session = Depends(get_db)):
     return transaction_crud.create_batch_transfer(db=db, batch=batch)
 
 @router.get("/history", response_model=list[transaction_schema.Transaction])
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.database.db import get_db
 from app.schemas import wallet as wallet_schema
 from app.crud import wallet as wallet_crud
+from app.core.rate_limiter import pin_rate_limit
 from typing import List
 
 router = APIRouter()
 
 @router.get("/", response_model=List[wallet_schema.Wallet])
-def read_wallets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    wallets = wallet_crud.get_wallets(db, skip=skip, limit=limit)
+def read_wallets(
+    response: Response,
+    after_id: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    wallets = wallet_crud.get_wallets(db, after_id=after_id, limit=limit)
+    # Cursor for the next page: pass it back as ?after_id=
+    # A short page is the last one, so no cursor is sent with it
+    if len(wallets) == limit:
+        response.headers["X-Next-After-Id"] = str(wallets[-1].id)
     return wallets
 
 @router.post("/", response_model=wallet_schema.Wallet)
@@ -23,7 +33,7 @@ def read_wallet(wallet_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Wallet not found")
     return db_wallet
 
-@router.post("/{wallet_id}/deposit", response_model=wallet_schema.Wallet)
+@router.post("/{wallet_id}/deposit", response_model=wallet_schema.Wallet, dependencies=[Depends(pin_rate_limit)])
 def deposit(wallet_id: int, deposit: wallet_schema.WalletDeposit, db: Session = Depends(get_db)):
     if deposit.amount <= 0:
         raise HTTPException(status_code=400, detail="Deposit amount must be greater than 0")
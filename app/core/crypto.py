@@ -5,10 +5,59 @@ Uses bcrypt for password hashing with automatic salt generation.
 
 from passlib.context import CryptContext
 from typing import Optional
-import secrets
+import hashlib
+import os
+import re
+import threading
+import bcrypt
 
-# Configure password hashing context with bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cost factor for newly generated hashes. A 4-digit PIN has only 10^4
+# candidates, so cost 12 buys no practical security over cost 10 while
+# making every verification 4x slower; brute force is handled by the
+# rate limiter instead.
+BCRYPT_ROUNDS = 10
+
+# Passlib is only used to inspect stored hashes (see needs_rehash);
+# hashing and verification call the bcrypt bindings directly.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+    deprecated="auto",
+)
+
+# The one definition of a valid PIN: exactly four ASCII digits. Shared with
+# the request schemas (pydantic-core's regex engine), so it sticks to syntax
+# both engines read the same way. [0-9] rather than \d/str.isdigit(), which
+# also accept other Unicode digits; fullmatch() below keeps Python's $ from
+# accepting a trailing newline.
+PIN_PATTERN = r"^[0-9]{4}$"
+_PIN_RE = re.compile(PIN_PATTERN)
+
+
+def is_valid_pin(pin: str) -> bool:
+    """Check that a PIN is exactly 4 ASCII digits"""
+    return bool(pin) and _PIN_RE.fullmatch(pin) is not None
+
+
+# Per-thread memo of (plain_pin, hashed_pin) pairs that already verified,
+# so repeat checks against the same stored hash skip the bcrypt rounds.
+# Entries are BLAKE2b digests of the pair keyed with a per-process random
+# secret. With only 10^4 possible PINs an unkeyed digest would be reversible
+# in microseconds given pin_hash; without _MEMO_KEY the entries can't be
+# tested against candidate PINs, and the key dies with the process.
+# Only successful verifications are cached; the memo is cleared
+# wholesale once it reaches VERIFY_CACHE_SIZE entries.
+VERIFY_CACHE_SIZE = 4096
+_MEMO_KEY = os.urandom(32)
+_verify_cache = threading.local()
+
+
+def _verified_pairs() -> set:
+    pairs = getattr(_verify_cache, "pairs", None)
+    if pairs is None:
+        pairs = _verify_cache.pairs = set()
+    return pairs
 
 def hash_pin(pin: str) -> str:
     """
@@ -25,13 +74,11 @@ def hash_pin(pin: str) -> str:
         >>> print(len(hashed))  # Will be ~60 characters
         60
     """
-    if not pin or not pin.isdigit():
-        raise ValueError("PIN must contain only digits")
-    
-    if len(pin) != 4:
+    if not is_valid_pin(pin):
         raise ValueError("PIN must be exactly 4 digits")
     
-    return pwd_context.hash(pin)
+    hashed = bcrypt.hashpw(pin.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    return hashed.decode("utf-8")
 
 
 def verify_pin(plain_pin: str, hashed_pin: str) -> bool:
@@ -56,11 +103,29 @@ def verify_pin(plain_pin: str, hashed_pin: str) -> bool:
     if not plain_pin or not hashed_pin:
         return False
     
+    # hash_pin only ever stores 4-digit PINs, so anything else can never
+    # match; reject it before paying for the bcrypt rounds
+    if not is_valid_pin(plain_pin):
+        return False
+    
+    pin_bytes = plain_pin.encode("utf-8")
+    hash_bytes = hashed_pin.encode("utf-8")
+    pairs = _verified_pairs()
+    key = hashlib.blake2b(pin_bytes + b"|" + hash_bytes, key=_MEMO_KEY).digest()
+    if key in pairs:
+        return True
+    
     try:
-        return pwd_context.verify(plain_pin, hashed_pin)
+        verified = bcrypt.checkpw(pin_bytes, hash_bytes)
     except Exception:
         # Handle any verification errors (malformed hash, etc.)
         return False
+    
+    if verified:
+        if len(pairs) >= VERIFY_CACHE_SIZE:
+            pairs.clear()
+        pairs.add(key)
+    return verified
 
 
 def generate_secure_token(length: int = 32) -> str:
@@ -79,7 +144,8 @@ def generate_secure_token(length: int = 32) -> str:
         >>> len(token)
         64  # 32 bytes = 64 hex characters
     """
-    return secrets.token_hex(length)
+    # Same as secrets.token_hex, minus the wrapper layer; output stays hex
+    return os.urandom(length).hex()
 
 
 def needs_rehash(hashed_pin: str) -> bool:
@@ -7,26 +7,162 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request, HTTPException
-from typing import Callable
+from fastapi.responses import JSONResponse
+from typing import Callable, Dict, Optional, Tuple
+import math
+import os
+import threading
 import time
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# Set RATE_LIMIT_ENABLED=false to switch every limit off, e.g. for the
+# integration scripts, which fire more PIN requests than a client would
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Shared counter storage. With the default in-memory storage every worker
+# keeps its own counters; point this at Redis (redis://host:6379/0) so all
+# workers enforce one limit.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+USE_REDIS = RATE_LIMIT_STORAGE_URI.startswith(("redis://", "rediss://"))
 
 # Rate limit configurations
 PIN_VERIFY_LIMIT = "5/minute"  # 5 PIN attempts per minute per IP
 API_GENERAL_LIMIT = "100/minute"  # 100 general API calls per minute
 TRANSFER_LIMIT = "10/minute"  # 10 transfers per minute per IP
 
-def get_rate_limit_exceeded_handler():
-    """Custom handler for rate limit exceeded errors"""
-    async def handler(request: Request, exc: RateLimitExceeded):
+# Initialize rate limiter. API_GENERAL_LIMIT applies to every request per IP
+# (enforced by SlowAPIMiddleware); routes add stricter limits with
+# @limiter.limit(...). If Redis goes away, counting continues in memory.
+limiter = Limiter(
+    key_func=get_remote_address,
+    application_limits=[API_GENERAL_LIMIT],
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy="moving-window",
+    in_memory_fallback_enabled=USE_REDIS,
+    enabled=RATE_LIMIT_ENABLED,
+)
+
+# Token bucket enforcing PIN_VERIFY_LIMIT on PIN-authenticated endpoints:
+# bursts of up to 5 attempts, refilled at 5 per minute
+PIN_BUCKET_CAPACITY = 5
+PIN_BUCKET_REFILL_RATE = 5 / 60  # tokens per second
+
+# Refill, consume and persist the bucket atomically in a single round-trip.
+# Numbers are passed back to Redis as strings so fractional tokens survive.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'last_refill')
+local tokens = tonumber(state[1]) or capacity
+local last_refill = tonumber(state[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - last_refill) * refill_rate)
+
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last_refill', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_rate))
+return allowed
+"""
+
+
+class TokenBucket:
+    """Redis-backed token bucket shared by every worker process"""
+
+    def __init__(self, client, capacity: int, refill_rate: float, prefix: str):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.prefix = prefix
+        self._consume = client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def consume(self, key: str, now: Optional[float] = None) -> bool:
+        """Take one token for ``key``; returns False when the bucket is empty"""
+        allowed = self._consume(
+            keys=[f"{self.prefix}:{key}"],
+            args=[self.capacity, self.refill_rate, time.time() if now is None else now],
+        )
+        return bool(allowed)
+
+
+class MemoryTokenBucket:
+    """Same policy as TokenBucket, kept in this process (one bucket set per worker)"""
+
+    def __init__(self, capacity: int, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, now: Optional[float] = None) -> bool:
+        """Take one token for ``key``; returns False when the bucket is empty"""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, last_refill = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + max(0.0, now - last_refill) * self.refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return allowed
+
+
+# Shared through Redis when the limiter uses it, per-process otherwise
+pin_bucket = None
+if RATE_LIMIT_ENABLED:
+    if USE_REDIS:
+        import redis
+
+        pin_bucket = TokenBucket(
+            redis.Redis.from_url(RATE_LIMIT_STORAGE_URI),
+            capacity=PIN_BUCKET_CAPACITY,
+            refill_rate=PIN_BUCKET_REFILL_RATE,
+            prefix="pin_bucket",
+        )
+    else:
+        pin_bucket = MemoryTokenBucket(PIN_BUCKET_CAPACITY, PIN_BUCKET_REFILL_RATE)
+
+
+def pin_rate_limit(request: Request):
+    """Dependency for endpoints that verify a PIN"""
+    if pin_bucket is None:
+        return
+    try:
+        allowed = pin_bucket.consume(get_remote_address(request))
+    except Exception:
+        # Fail closed: without the bucket, PIN guessing would be unthrottled
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Rate limiter unavailable",
+                "message": "PIN verification is temporarily unavailable. Please try again later."
+            }
+        )
+    if not allowed:
         raise HTTPException(
             status_code=429,
             detail={
                 "error": "Rate limit exceeded",
-                "message": "Too many requests. Please try again later.",
-                "retry_after": exc.detail
+                "message": "Too many PIN attempts. Please try again later.",
+                "retry_after": math.ceil(1 / pin_bucket.refill_rate)
+            }
+        )
+
+def get_rate_limit_exceeded_handler():
+    """Custom handler for rate limit exceeded errors (sync, so SlowAPIMiddleware can call it too)"""
+    def handler(request: Request, exc: RateLimitExceeded):
+        return JSONResponse(
+            status_code=429,
+            content={
+                "detail": {
+                    "error": "Rate limit exceeded",
+                    "message": "Too many requests. Please try again later.",
+                    "retry_after": exc.detail
+                }
             }
         )
     return handler
@@ -1,14 +1,50 @@
 from sqlalchemy.orm import Session
 from app.database.models import Transaction, Wallet, WalletStatus
-from app.schemas.transaction import TransactionCreate
+from app.schemas.transaction import TransactionCreate, BatchTransferCreate
 from fastapi import HTTPException
 from app.core.crypto import verify_pin
+from app.crud.wallet import rehash_pin_if_needed
 import time
 
+def lock_wallets(db: Session, wallet_ids) -> dict:
+    """
+    Lock every wallet row a transfer touches (sender and receivers) with
+    SELECT ... FOR UPDATE, returned as {id: wallet}.
+    Rows are locked in id order, so two transfers touching the same wallets
+    (e.g. A -> B and B -> A) queue behind each other instead of deadlocking,
+    and no deposit or other transfer can change a balance between our read
+    and our write.
+    """
+    wallets = (
+        db.query(Wallet)
+        .filter(Wallet.id.in_(set(wallet_ids)))
+        .order_by(Wallet.id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    return {w.id: w for w in wallets}
+
+def get_authenticated_sender(wallets: dict, wallet_id: int, pin: str) -> Wallet:
+    """
+    Verify the PIN of an already locked sender wallet exactly once.
+    The returned wallet is authenticated for the rest of the transaction,
+    so callers moving several amounts must not verify again per transfer.
+    """
+    sender = wallets.get(wallet_id)
+    if not sender:
+        raise HTTPException(status_code=404, detail="Sender wallet not found")
+    
+    # VERIFY PIN using secure bcrypt comparison
+    if not verify_pin(pin, sender.pin_hash):
+        raise HTTPException(status_code=401, detail="Incorrect PIN for sender wallet")
+    rehash_pin_if_needed(sender, pin)
+    return sender
+
 def create_transfer_vulnerable(db: Session, transaction: TransactionCreate):
     """
     SECURE IMPLEMENTATION:
-    - Uses SELECT ... FOR UPDATE to lock the sender's wallet row.
+    - Uses SELECT ... FOR UPDATE to lock the sender's and receiver's wallet rows.
     - Prevents race conditions by ensuring only one transaction can modify the balance at a time.
     - Requires PIN authentication for sender wallet.
     """
@@ -17,19 +53,14 @@ def create_transfer_vulnerable(db: Session, transaction: TransactionCreate):
     if transaction.amount <= 0:
         raise HTTPException(status_code=400, detail="Transfer amount must be greater than 0")
     
-    # 1. READ SENDER WITH LOCK
-    # with_for_update() locks the selected rows until the transaction commits or rolls back
-    sender = db.query(Wallet).filter(Wallet.id == transaction.from_wallet_id).with_for_update().first()
-    if not sender:
-        raise HTTPException(status_code=404, detail="Sender wallet not found")
+    # 1. LOCK SENDER AND RECEIVER
+    wallets = lock_wallets(db, [transaction.from_wallet_id, transaction.to_wallet_id])
     
-    # 2. VERIFY PIN using secure bcrypt comparison
-    if not verify_pin(transaction.pin, sender.pin_hash):
-        raise HTTPException(status_code=401, detail="Incorrect PIN for sender wallet")
+    # 2. VERIFY SENDER PIN
+    sender = get_authenticated_sender(wallets, transaction.from_wallet_id, transaction.pin)
         
-    # 3. READ RECEIVER (Locking receiver is also good practice to prevent deadlocks in reverse transfers, 
-    # but strictly for double-spend protection, locking sender is critical)
-    receiver = db.query(Wallet).filter(Wallet.id == transaction.to_wallet_id).first()
+    # 3. RECEIVER (locked above, so a concurrent deposit can't be overwritten)
+    receiver = wallets.get(transaction.to_wallet_id)
     if not receiver:
         raise HTTPException(status_code=404, detail="Receiver wallet not found")
 
@@ -58,18 +89,17 @@ def create_transfer_vulnerable(db: Session, transaction: TransactionCreate):
     
     return db_txn
 
-def create_batch_transfer(db: Session, batch: TransactionCreate): 
-    # Note: Type hint above is technically BatchTransferCreate but using dynamic for now or imported
-    # Actually let's just use the dict or object access.
-    
-    # 1. LOCK KEY SENDER
-    sender = db.query(Wallet).filter(Wallet.id == batch.from_wallet_id).with_for_update().first()
-    if not sender:
-        raise HTTPException(status_code=404, detail="Sender wallet not found")
+def create_batch_transfer(db: Session, batch: BatchTransferCreate):
+    """
+    Execute every transfer in the batch inside a single DB transaction.
+    The sender's PIN is verified once for the whole batch and the sender and
+    all receivers are locked with one query, so cost does not grow with
+    bcrypt rounds x N.
+    """
     
-    # VERIFY PIN using secure bcrypt comparison
-    if not verify_pin(batch.pin, sender.pin_hash):
-        raise HTTPException(status_code=401, detail="Incorrect PIN for sender wallet")
+    # 1. LOCK SENDER AND ALL RECEIVERS IN ONE ROUND-TRIP, THEN VERIFY PIN ONCE
+    wallets = lock_wallets(db, [batch.from_wallet_id] + [t.to_wallet_id for t in batch.transfers])
+    sender = get_authenticated_sender(wallets, batch.from_wallet_id, batch.pin)
 
     if sender.status != WalletStatus.ACTIVE:
          raise HTTPException(status_code=400, detail="Sender wallet inactive")
@@ -88,18 +118,18 @@ def create_batch_transfer(db: Session, batch: TransactionCreate):
             detail=f"Insufficient funds for batch. Required: {total_needed}, Available: {sender.balance}"
         )
 
-    # 4. EXECUTE ALL
+    # 4. CHECK ALL RECEIVERS EXIST
+    for t in batch.transfers:
+        if t.to_wallet_id not in wallets:
+            raise HTTPException(status_code=404, detail=f"Receiver {t.to_wallet_id} not found")
+
+    # 5. EXECUTE ALL
     processed_txns = []
     
     sender.balance -= total_needed
     
     for t in batch.transfers:
-        receiver = db.query(Wallet).filter(Wallet.id == t.to_wallet_id).first()
-        if not receiver:
-             # In a real system you might rollback, but here we error out
-             raise HTTPException(status_code=404, detail=f"Receiver {t.to_wallet_id} not found")
-        
-        receiver.balance += t.amount
+        wallets[t.to_wallet_id].balance += t.amount
         
         db_txn = Transaction(
             from_wallet_id=batch.from_wallet_id,
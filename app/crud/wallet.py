@@ -2,7 +2,7 @@ from sqlalchemy.orm import Session
 from app.database.models import Wallet
 from app.schemas.wallet import WalletCreate
 from fastapi import HTTPException
-from app.core.crypto import hash_pin, verify_pin
+from app.core.crypto import hash_pin, verify_pin, needs_rehash
 
 def create_wallet(db: Session, wallet: WalletCreate):
     # Hash the PIN before storing
@@ -14,30 +14,47 @@ def create_wallet(db: Session, wallet: WalletCreate):
     return db_wallet
 
 def get_wallet(db: Session, wallet_id: int):
-    return db.query(Wallet).filter(Wallet.id == wallet_id).first()
+    # Session.get() checks the identity map before emitting a SELECT
+    return db.get(Wallet, wallet_id)
 
-def get_wallets(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Wallet).offset(skip).limit(limit).all()
+def get_wallets(db: Session, after_id: int = 0, limit: int = 100):
+    # Keyset pagination: seek past the last seen id via the PK index
+    # instead of scanning and discarding OFFSET rows
+    return db.query(Wallet).filter(Wallet.id > after_id).order_by(Wallet.id).limit(limit).all()
+
+def rehash_pin_if_needed(wallet: Wallet, pin: str) -> bool:
+    """Re-hash an already verified PIN if it was stored with outdated bcrypt parameters.
+    The caller is responsible for committing the session."""
+    if not needs_rehash(wallet.pin_hash):
+        return False
+    wallet.pin_hash = hash_pin(pin)
+    return True
 
 def verify_wallet_pin(db: Session, wallet_id: int, pin: str) -> bool:
     """Verify if the provided PIN matches the wallet's hashed PIN"""
     wallet = get_wallet(db, wallet_id)
     if not wallet:
         return False
-    return verify_pin(pin, wallet.pin_hash)
+    if not verify_pin(pin, wallet.pin_hash):
+        return False
+    if rehash_pin_if_needed(wallet, pin):
+        db.commit()
+    return True
 
 def deposit_wallet(db: Session, wallet_id: int, amount: float, pin: str):
-    wallet = get_wallet(db, wallet_id)
+    # Lock the row so concurrent deposits can't lose each other's update
+    wallet = db.query(Wallet).filter(Wallet.id == wallet_id).with_for_update().first()
     if not wallet:
         return None
     
     # Verify PIN using secure comparison
     if not verify_pin(pin, wallet.pin_hash):
         raise HTTPException(status_code=401, detail="Incorrect PIN")
+    rehash_pin_if_needed(wallet, pin)
     
     wallet.balance += amount
+    # Sessions don't expire on commit, so the balance set above is current
     db.commit()
-    db.refresh(wallet)
     return wallet
 
 def delete_wallet(db: Session, wallet_id: int):
@@ -21,7 +21,7 @@ class Wallet(Base):
     __tablename__ = "wallets"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     balance = Column(Float, default=0.0)
     status = Column(Enum(WalletStatus), default=WalletStatus.ACTIVE)
     pin_hash = Column(String(255), nullable=False)  # Hashed PIN using bcrypt
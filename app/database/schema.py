@@ -0,0 +1,93 @@
+"""
+One-time schema bootstrap shared by every worker on a host.
+
+The first worker to take the lock runs create_all and records the outcome in
+the lock file. Workers that take the lock afterwards read that marker: after
+a success they only run one cheap probe query, after a recent failure they
+make a single attempt instead of sitting through the whole retry window again.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock
+    fcntl = None
+
+SCHEMA_LOCK_PATH = os.getenv("SCHEMA_LOCK_PATH", os.path.join(tempfile.gettempdir(), "wallet_schema.lock"))
+
+# The database may still be starting (docker-compose's depends_on doesn't
+# wait for readiness), so retry before falling back to demo mode
+SCHEMA_INIT_RETRIES = max(0, int(os.getenv("SCHEMA_INIT_RETRIES", "0")))
+SCHEMA_INIT_RETRY_DELAY = 2  # seconds
+
+# A failure recorded this recently means the database is still down for the
+# whole boot; later workers then try once instead of retrying again
+FAILURE_MARKER_TTL = SCHEMA_INIT_RETRIES * SCHEMA_INIT_RETRY_DELAY + 30  # seconds
+
+
+def _fingerprint(engine, metadata) -> str:
+    """Identify the database and table set, so a marker never carries over to another schema"""
+    source = engine.url.render_as_string(hide_password=True) + "|" + ",".join(sorted(metadata.tables))
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def _tables_exist(engine, metadata) -> bool:
+    """One round-trip check that the database is reachable and every table is there"""
+    probe = "SELECT 1 FROM " + ", ".join(sorted(metadata.tables)) + " LIMIT 0"
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(probe))
+        return True
+    except Exception:
+        return False
+
+
+def _create_all(engine, metadata, attempts: int) -> bool:
+    error = None
+    for attempt in range(attempts):
+        try:
+            metadata.create_all(bind=engine)
+            return True
+        except Exception as e:
+            error = e
+            if attempt < attempts - 1:
+                time.sleep(SCHEMA_INIT_RETRY_DELAY)
+    print(f"Warning: Database not available - running in demo mode. Error: {error}")
+    return False
+
+
+def init_schema(engine, metadata) -> bool:
+    """
+    Make sure the schema exists, inspecting the database at most once per host.
+    Returns True if the database is usable.
+    """
+    fingerprint = _fingerprint(engine, metadata)
+
+    with open(SCHEMA_LOCK_PATH, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        lock_file.seek(0)
+        marker = lock_file.read().split()
+
+        attempts = SCHEMA_INIT_RETRIES + 1
+        if marker[:2] == ["ok", fingerprint]:
+            # Schema already created by another worker; just confirm we can reach it
+            if _tables_exist(engine, metadata):
+                return True
+        elif marker[:2] == ["failed", fingerprint] and len(marker) == 3:
+            if time.time() - float(marker[2]) < FAILURE_MARKER_TTL:
+                attempts = 1
+
+        ok = _create_all(engine, metadata, attempts)
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"ok {fingerprint}" if ok else f"failed {fingerprint} {time.time()}")
+        lock_file.flush()
+        return ok
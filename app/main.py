@@ -1,33 +1,80 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import threading
+
+from fastapi import Depends, FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from starlette.datastructures import URL
+from starlette.exceptions import HTTPException
+from starlette.responses import RedirectResponse
+from starlette.routing import Match, Mount
+from slowapi.errors import RateLimitExceeded
+from slowapi.middleware import SlowAPIMiddleware
+from app.core.rate_limiter import limiter, get_rate_limit_exceeded_handler
 import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create missing tables once at startup instead of at import time in every worker
+    ensure_db()
+    yield
+
 # Initialize FastAPI app first
-app = FastAPI(title="Wallet Engine (Build Phase)")
+app = FastAPI(title="Wallet Engine (Build Phase)", lifespan=lifespan)
+
+# Rate limiting: per-route limits via @limiter.limit, API_GENERAL_LIMIT for everything
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, get_rate_limit_exceeded_handler())
+app.add_middleware(SlowAPIMiddleware)
+
+# Set once the schema has been checked; until then (or if the database is
+# unreachable) the API answers 503 and the app runs in demo mode
+DB_AVAILABLE = False
+_db_checked = False
+_db_check_lock = threading.Lock()
+
+def ensure_db():
+    """
+    Run the schema bootstrap once per process. Called from lifespan, and again
+    from require_db on hosts that never send lifespan events (serverless, or a
+    TestClient used outside a with block).
+    """
+    global DB_AVAILABLE, _db_checked
+    if _db_checked:
+        return
+    with _db_check_lock:
+        if _db_checked or not DB_MODULES_LOADED:
+            _db_checked = True
+            return
+        DB_AVAILABLE = schema.init_schema(db.engine, models.Base.metadata)
+        _db_checked = True
+
+def require_db():
+    """Router dependency: reject API calls while the database is unavailable"""
+    ensure_db()
+    if not DB_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Database unavailable - running in demo mode")
 
 # Try to initialize database (optional for serverless deployment)
 try:
-    from app.database import models, db
+    from app.database import models, db, schema
     from app.api import users, wallets, transfer
     
-    # Create tables only if database is available
-    models.Base.metadata.create_all(bind=db.engine)
+    # API routers refuse requests through require_db if the database can't be reached
+    app.include_router(users.router, prefix="/api/v1/users", tags=["users"], dependencies=[Depends(require_db)])
+    app.include_router(wallets.router, prefix="/api/v1/wallets", tags=["wallets"], dependencies=[Depends(require_db)])
+    app.include_router(transfer.router, prefix="/api/v1/transfer", tags=["transfer"], dependencies=[Depends(require_db)])
     
-    # Include API routers only if database is available
-    app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
-    app.include_router(wallets.router, prefix="/api/v1/wallets", tags=["wallets"])
-    app.include_router(transfer.router, prefix="/api/v1/transfer", tags=["transfer"])
-    
-    DB_AVAILABLE = True
+    DB_MODULES_LOADED = True
 except Exception as e:
     # Database not available - running in demo mode
-    DB_AVAILABLE = False
+    DB_MODULES_LOADED = False
     print(f"Warning: Database not available - running in demo mode. Error: {e}")
 
 # Health check endpoint (works without database)
 @app.get("/health")
-async def health_check():
+@limiter.exempt
+def health_check():
+    ensure_db()
     return {
         "status": "ok",
         "database": "connected" if DB_AVAILABLE else "unavailable",
@@ -35,36 +82,43 @@ async def health_check():
     }
 
 # Serve UI
-app.mount("/static", StaticFiles(directory="ui"), name="static")
-
-@app.get("/")
-async def read_index():
-    return FileResponse('ui/index.html')
+# Let browsers reuse UI files for a few minutes, then revalidate with the
+# ETag/Last-Modified headers StaticFiles already sends (304, no body)
+UI_CACHE_CONTROL = "public, max-age=300"
 
-@app.get("/users")
-async def read_users():
-    return FileResponse('ui/users.html')
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that adds a Cache-Control header to every file response"""
 
-@app.get("/wallets")
-async def read_wallets():
-    return FileResponse('ui/wallets.html')
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = UI_CACHE_CONTROL
+        return response
 
-@app.get("/deposit")
-async def read_deposit():
-    return FileResponse('ui/deposit.html')
+class UIStaticFiles(CachedStaticFiles):
+    """StaticFiles that also resolves extensionless page URLs (/deposit -> deposit.html)"""
 
-@app.get("/transfer")
-async def read_transfer():
-    return FileResponse('ui/transfer.html')
+    def lookup_path(self, path: str):
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is None and path and not os.path.splitext(path)[1]:
+            return super().lookup_path(path + ".html")
+        return full_path, stat_result
 
-@app.get("/balance")
-async def read_balance():
-    return FileResponse('ui/balance.html')
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            # Being mounted at "/" means the router never falls back to its
+            # trailing-slash redirect, so redo it for paths an API route serves
+            if exc.status_code in (404, 405) and scope["path"] != "/":
+                url = URL(scope=scope)
+                toggled = url.path[:-1] if url.path.endswith("/") else url.path + "/"
+                redirect_scope = {**scope, "path": toggled}
+                for route in scope["router"].routes:
+                    if not isinstance(route, Mount) and route.matches(redirect_scope)[0] != Match.NONE:
+                        return RedirectResponse(url.replace(path=toggled))
+            raise
 
-@app.get("/transactions")
-async def read_transactions_ui():
-    return FileResponse('ui/transactions.html')
+app.mount("/static", CachedStaticFiles(directory="ui"), name="static")
 
-@app.get("/voice-assistance")
-async def read_voice_assistance():
-    return FileResponse('ui/voice-assistance.html')
+# Mounted last so /health, /docs and the API routers take precedence
+app.mount("/", UIStaticFiles(directory="ui", html=True), name="ui")
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field
 from datetime import datetime
+from app.schemas.wallet import PinStr
 
 class TransactionBase(BaseModel):
     from_wallet_id: int
@@ -13,26 +14,10 @@ class TransferTarget(BaseModel):
 class BatchTransferCreate(BaseModel):
     from_wallet_id: int
     transfers: list[TransferTarget]
-    pin: str = Field(..., min_length=4, max_length=4, description="4-digit PIN for sender wallet")
-    
-    @validator('pin')
-    def validate_pin(cls, v):
-        if not v.isdigit():
-            raise ValueError('PIN must contain only digits')
-        if len(v) != 4:
-            raise ValueError('PIN must be exactly 4 digits')
-        return v
+    pin: PinStr = Field(..., description="4-digit PIN for sender wallet")
 
 class TransactionCreate(TransactionBase):
-    pin: str = Field(..., min_length=4, max_length=4, description="4-digit PIN for sender wallet")
-    
-    @validator('pin')
-    def validate_pin(cls, v):
-        if not v.isdigit():
-            raise ValueError('PIN must contain only digits')
-        if len(v) != 4:
-            raise ValueError('PIN must be exactly 4 digits')
-        return v
+    pin: PinStr = Field(..., description="4-digit PIN for sender wallet")
 
 class Transaction(TransactionBase):
     id: int
@@ -1,21 +1,17 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional
+from pydantic import BaseModel, Field, StringConstraints
+from typing import Optional, Annotated
 from app.database.models import WalletStatus
+from app.core.crypto import PIN_PATTERN
+
+# 4-digit PIN, validated by pydantic-core's regex engine (no Python callback per request)
+PinStr = Annotated[str, StringConstraints(pattern=PIN_PATTERN)]
 
 class WalletBase(BaseModel):
     pass
 
 class WalletCreate(WalletBase):
     user_id: int
-    pin: str = Field(..., min_length=4, max_length=4, description="4-digit PIN")
-    
-    @validator('pin')
-    def validate_pin(cls, v):
-        if not v.isdigit():
-            raise ValueError('PIN must contain only digits')
-        if len(v) != 4:
-            raise ValueError('PIN must be exactly 4 digits')
-        return v
+    pin: PinStr = Field(..., description="4-digit PIN")
 
 class Wallet(WalletBase):
     id: int
@@ -28,12 +24,4 @@ class Wallet(WalletBase):
 
 class WalletDeposit(BaseModel):
     amount: float
-    pin: str = Field(..., min_length=4, max_length=4, description="4-digit PIN for authentication")
-    
-    @validator('pin')
-    def validate_pin(cls, v):
-        if not v.isdigit():
-            raise ValueError('PIN must contain only digits')
-        if len(v) != 4:
-            raise ValueError('PIN must be exactly 4 digits')
-        return v
+    pin: PinStr = Field(..., description="4-digit PIN for authentication")
@@ -10,15 +10,19 @@ Usage:
 
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 # Add parent directory to path to import app modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database.db import SessionLocal, engine
 from app.database.models import Base, Wallet
-from app.core.crypto import hash_pin
+from app.core.crypto import hash_pin, is_valid_pin
 from sqlalchemy import text
 
+# Rows fetched and updated per round-trip
+MIGRATION_BATCH_SIZE = 1000
+
 def migrate_pins_to_hashed():
     """
     Migrate all existing plaintext PINs to hashed PINs.
@@ -65,37 +69,44 @@ def migrate_pins_to_hashed():
             ))
             
             if result.fetchone():
-                # Old column exists, migrate data
-                wallets = db.query(Wallet).all()
+                # Old column exists, migrate data in streamed batches:
+                # one SELECT for the whole table, one executemany UPDATE per batch
+                rows = db.execute(
+                    text("SELECT id, pin FROM wallets WHERE pin IS NOT NULL"),
+                    execution_options={"yield_per": MIGRATION_BATCH_SIZE}
+                )
+                
+                migrated_count = 0
+                # bcrypt is CPU-bound, so hash each batch across all cores
+                with ProcessPoolExecutor() as pool:
+                    for chunk in rows.partitions(MIGRATION_BATCH_SIZE):
+                        valid = []
+                        for row in chunk:
+                            if len(row.pin) != 4:
+                                continue
+                            if not is_valid_pin(row.pin):
+                                print(f"   ❌ Error migrating wallet {row.id}: PIN must contain only digits")
+                                continue
+                            valid.append(row)
+                        
+                        if not valid:
+                            continue
+                        
+                        hashes = pool.map(hash_pin, [row.pin for row in valid], chunksize=32)
+                        db.execute(
+                            text("UPDATE wallets SET pin_hash = :hash WHERE id = :id"),
+                            [{"id": row.id, "hash": hashed} for row, hashed in zip(valid, hashes)]
+                        )
+                        migrated_count += len(valid)
+                        print(f"   ✅ Migrated {migrated_count} wallet(s) so far")
                 
-                if not wallets:
+                # Single commit: committing per batch would close the
+                # server-side cursor the SELECT above is streaming from
+                db.commit()
+                
+                if not migrated_count:
                     print("   ℹ️  No wallets found to migrate")
                 else:
-                    migrated_count = 0
-                    for wallet in wallets:
-                        try:
-                            # Get plaintext PIN from old column
-                            old_pin = db.execute(
-                                text("SELECT pin FROM wallets WHERE id = :id"),
-                                {"id": wallet.id}
-                            ).fetchone()[0]
-                            
-                            if old_pin and len(old_pin) == 4:
-                                # Hash the PIN
-                                hashed = hash_pin(old_pin)
-                                
-                                # Update pin_hash
-                                db.execute(
-                                    text("UPDATE wallets SET pin_hash = :hash WHERE id = :id"),
-                                    {"hash": hashed, "id": wallet.id}
-                                )
-                                migrated_count += 1
-                                print(f"   ✅ Migrated wallet {wallet.id}")
-                        except Exception as e:
-                            print(f"   ❌ Error migrating wallet {wallet.id}: {e}")
-                            continue
-                    
-                    db.commit()
                     print(f"\n   ✅ Successfully migrated {migrated_count} wallet(s)")
                 
                 # Step 3: Drop old pin column
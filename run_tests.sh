@@ -12,7 +12,8 @@ if netstat -tln | grep -q ":$PORT "; then
     echo "1. Server appears to be running on port $PORT."
 else
     echo "1. Starting Backend Server..."
-    nohup uvicorn app.main:app --host $HOST --port $PORT > server.log 2>&1 &
+    # The concurrency test fires more PIN requests than the limiter allows
+    RATE_LIMIT_ENABLED=false nohup uvicorn app.main:app --host $HOST --port $PORT > server.log 2>&1 &
     SERVER_PID=$!
     echo "Server PID: $SERVER_PID"
     echo "Waiting 5 seconds for server to initialize..."
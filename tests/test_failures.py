@@ -4,6 +4,7 @@ import time
 import sys
 
 BASE_URL = "http://localhost:8000/api/v1"
+TEST_PIN = "1234"
 
 def create_user(username, email):
     res = requests.post(f"{BASE_URL}/users/", json={"username": username, "email": email})
@@ -13,11 +14,15 @@ def create_user(username, email):
     return res.json()
 
 def create_wallet(user_id):
-    res = requests.post(f"{BASE_URL}/wallets/", json={"user_id": user_id})
+    res = requests.post(f"{BASE_URL}/wallets/", json={"user_id": user_id, "pin": TEST_PIN})
     return res.json()
 
 def deposit(wallet_id, amount):
-    res = requests.post(f"{BASE_URL}/wallets/{wallet_id}/deposit", json={"amount": amount})
+    res = requests.post(f"{BASE_URL}/wallets/{wallet_id}/deposit", json={"amount": amount, "pin": TEST_PIN})
+    if res.status_code != 200:
+        # e.g. 429 from the PIN rate limiter - the test can't say anything without funds
+        print(f"Setup error: deposit failed with {res.status_code}: {res.text}")
+        sys.exit(1)
     return res.json()
 
 def get_balance(wallet_id):
@@ -28,7 +33,8 @@ def transfer(from_id, to_id, amount):
     res = requests.post(f"{BASE_URL}/transfer/", json={
         "from_wallet_id": from_id,
         "to_wallet_id": to_id,
-        "amount": amount
+        "amount": amount,
+        "pin": TEST_PIN
     })
     return res.status_code
 
@@ -74,6 +80,10 @@ def run_concurrent_test():
         
     final_balance = get_balance(w1['id'])
     print(f"Results codes: {results}")
+    
+    if 429 in results:
+        print("INCONCLUSIVE: Transfers were rate limited. Restart the server with RATE_LIMIT_ENABLED=false.")
+        sys.exit(1)
     print(f"Final Balance W1: {final_balance}")
     
     # 3. Assert Failure
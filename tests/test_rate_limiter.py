@@ -0,0 +1,70 @@
+"""
+Unit tests for the PIN token buckets in app/core/rate_limiter.py.
+Runs without a server; the Redis bucket's Lua script is executed by fakeredis.
+
+Usage:
+    python -m pytest tests/test_rate_limiter.py
+"""
+
+import pytest
+
+from app.core.rate_limiter import TokenBucket, MemoryTokenBucket
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis needs lupa to run Lua scripts
+
+CAPACITY = 5
+REFILL_RATE = 5 / 60  # tokens per second
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(params=["redis", "memory"])
+def bucket(request):
+    if request.param == "redis":
+        return TokenBucket(fakeredis.FakeRedis(), CAPACITY, REFILL_RATE, prefix="test_bucket")
+    return MemoryTokenBucket(CAPACITY, REFILL_RATE)
+
+
+def test_allows_burst_up_to_capacity(bucket):
+    results = [bucket.consume("1.2.3.4", now=NOW) for _ in range(CAPACITY + 2)]
+    assert results == [True] * CAPACITY + [False, False]
+
+
+def test_buckets_are_per_key(bucket):
+    for _ in range(CAPACITY):
+        bucket.consume("1.2.3.4", now=NOW)
+    assert not bucket.consume("1.2.3.4", now=NOW)
+    assert bucket.consume("5.6.7.8", now=NOW)
+
+
+def test_refills_over_time(bucket):
+    for _ in range(CAPACITY):
+        bucket.consume("1.2.3.4", now=NOW)
+    # One token comes back every 12 seconds
+    assert not bucket.consume("1.2.3.4", now=NOW + 11)
+    assert bucket.consume("1.2.3.4", now=NOW + 12.5)
+    assert not bucket.consume("1.2.3.4", now=NOW + 13)
+
+
+def test_refill_is_capped_at_capacity(bucket):
+    bucket.consume("1.2.3.4", now=NOW)
+    results = [bucket.consume("1.2.3.4", now=NOW + 3600) for _ in range(CAPACITY + 1)]
+    assert results == [True] * CAPACITY + [False]
+
+
+def test_redis_state_is_shared_and_expires():
+    server = fakeredis.FakeServer()
+    worker_a = TokenBucket(fakeredis.FakeRedis(server=server), CAPACITY, REFILL_RATE, prefix="pin_bucket")
+    worker_b = TokenBucket(fakeredis.FakeRedis(server=server), CAPACITY, REFILL_RATE, prefix="pin_bucket")
+
+    for _ in range(CAPACITY):
+        assert worker_a.consume("1.2.3.4", now=NOW)
+    # Half a token has refilled after 6 seconds: not enough
+    assert not worker_b.consume("1.2.3.4", now=NOW + 6)
+
+    client = fakeredis.FakeRedis(server=server)
+    # Fractional token counts must survive the round-trip through Redis
+    assert float(client.hget("pin_bucket:1.2.3.4", "tokens")) == pytest.approx(0.5)
+    assert worker_a.consume("1.2.3.4", now=NOW + 12)
+    # A full bucket's worth of refill time, then the key can go
+    assert 0 < client.ttl("pin_bucket:1.2.3.4") <= CAPACITY / REFILL_RATE